@@ -57,9 +57,7 @@ def main() -> None:
     signal.signal(signal.SIGTERM, _shutdown)
 
     # Wait for the onion service to appear (when Tor is available)
-    deadline = time.time() + max(0, args.onion_wait_time)
-    while not primary.onion_address and time.time() < deadline:
-        time.sleep(1)
+    primary.onion_ready.wait(timeout=max(0, args.onion_wait_time))
 
     if primary.onion_address:
         print(f"Primary node onion service: {primary.onion_address}")
@@ -23,7 +23,7 @@ def main():
         tor_control_password=tor_control_password
     )
     primary_node.start_server()
-    time.sleep(5) # Give the server and its distributed nodes a moment to start and publish onion services
+    primary_node.onion_ready.wait(timeout=60) # Returns as soon as the onion service is published (or Tor is unavailable)
 
     print("PrimaryNode server and distributed nodes started.")
 
@@ -1,15 +1,14 @@
 import sys
 import os
-import json
 import socks
 import socket
-import time
-from typing import Dict, Any
-import pgpy
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Iterable, List
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
-from src.crypto.utils import generate_pgp_key, decrypt_pgp, decrypt_aes, encrypt_pgp
+from src.crypto.utils import generate_pgp_key, decrypt_pgp, decrypt_aes, encrypt_pgp, load_pgp_pubkey
+from src.network import wire
 from src.network.client_connection import ClientConnection
 
 class Client:
@@ -44,21 +43,21 @@ class Client:
             'type': 'get_payload',
             'pub_key': str(self.pub_key) # Convert PGPKey object to string (PEM format)
         }
-        response = self.connection.send_data(json.dumps(request).encode('utf-8'))
+        response = self.connection.send_data(wire.json_dumps(request))
         return self.decrypt_lock_cycle_payload(response)
 
     def decrypt_lock_cycle_payload(self, payload: bytes) -> dict:
         """Decrypts the lock-cycle payload received from the primary node."""
-        payload_data = json.loads(payload.decode('utf-8'))
-        encrypted_payload_aes = bytes.fromhex(payload_data['encrypted_payload'])
-        encrypted_aes_key_pgp = bytes.fromhex(payload_data['encrypted_aes_key'])
+        payload_data = wire.unpack(payload)
+        encrypted_payload_aes = payload_data['encrypted_payload']
+        encrypted_aes_key_pgp = payload_data['encrypted_aes_key']
 
         # Decrypt AES key with PGP
         aes_key = decrypt_pgp(encrypted_aes_key_pgp, self.priv_key)
 
         # Decrypt payload with AES
         decrypted_payload_bytes = decrypt_aes(encrypted_payload_aes, aes_key)
-        return json.loads(decrypted_payload_bytes.decode('utf-8'))
+        return wire.json_loads(decrypted_payload_bytes)
 
     def _make_tor_request(self, onion_address: str, data: bytes) -> bytes:
         """Makes a request to an onion address via the Tor SOCKS proxy."""
@@ -66,25 +65,18 @@ class Client:
         sock.set_proxy(socks.SOCKS5, self.tor_socks_proxy_host, self.tor_socks_proxy_port)
         sock.connect((onion_address, 80)) # Onion services typically listen on port 80
 
-        # Send data
-        sock.sendall(data)
-
-        # Receive response
-        response_bytes = b""
-        while True:
-            chunk = sock.recv(4096)
-            if not chunk:
-                break
-            response_bytes += chunk
-        sock.close()
-        return response_bytes
+        try:
+            sock.sendall(wire.frame(data))
+            return wire.read_frame(sock)
+        finally:
+            sock.close()
 
     def send_data_through_distributed_proxy_chain(self, original_data: bytes, proxy_chain_config: Dict[str, Any], final_destination: str = None) -> bytes:
         """Sends data through the distributed proxy chain (onion routing style)."""
         node_order = proxy_chain_config["node_order"]
         node_configs = proxy_chain_config["node_configs"]
 
-        current_encrypted_payload = original_data.hex() # Start with the original data, to be encrypted in layers
+        current_encrypted_payload = original_data # Start with the original data, to be encrypted in layers
 
         # Build the onion: encrypt from inside out (last node to first node)
         # The innermost layer is the actual data for the last node.
@@ -117,8 +109,8 @@ class Client:
             }
             
             # Encrypt the payload for the current node using its public key
-            node_pubkey, _ = pgpy.PGPKey.from_blob(node_pubkey_pem.encode("utf-8"))
-            current_encrypted_payload = encrypt_pgp(json.dumps(payload_for_node).encode("utf-8"), node_pubkey).hex()
+            node_pubkey = load_pgp_pubkey(node_pubkey_pem)
+            current_encrypted_payload = encrypt_pgp(wire.pack(payload_for_node), node_pubkey)
 
         # Now, current_encrypted_payload holds the fully layered (onion) message.
         # Send this to the first node in the chain.
@@ -127,22 +119,43 @@ class Client:
         first_node_onion = first_node_info["onion_address"]
 
         print(f"Client: Sending layered data to first node: {first_node_onion}")
-        response_from_chain = self._make_tor_request(first_node_onion, json.dumps({"encrypted_data": current_encrypted_payload}).encode("utf-8"))
+        response_from_chain = self._make_tor_request(first_node_onion, wire.pack({"encrypted_data": current_encrypted_payload}))
 
         # The response from the chain will be the final processed data from the last node.
-        # The last node returns a JSON with {"status": "final_processed", "data": processed_data.hex()}
+        # The last node returns an envelope with {"status": "final_processed", "data": processed_data}
         try:
-            final_response = json.loads(response_from_chain.decode("utf-8"))
+            final_response = wire.unpack(response_from_chain)
             if final_response.get("status") == "final_processed":
                 print(f"Client: Received final processed data from chain.")
-                return bytes.fromhex(final_response["data"])
+                return final_response["data"]
             else:
                 print(f"Client: Unexpected response from chain: {final_response}")
                 return b"Error: Unexpected response from chain."
-        except json.JSONDecodeError:
+        except ValueError:
             print(f"Client: Failed to decode final response from chain: {response_from_chain}")
             return b"Error: Failed to decode final response."
 
+    def send_data_stream_through_distributed_proxy_chain(self, packets: Iterable[bytes], proxy_chain_config: Dict[str, Any], final_destination: str = None) -> List[bytes]:
+        """Pipelines a stream of packets through the distributed proxy chain.
+
+        Dispatches with a sliding window equal to the chain length so packet
+        k's first-hop encryption and send overlap packet k-1's later hops,
+        instead of waiting end-to-end for each packet in turn. Results come
+        back in submission order.
+        """
+        window = max(1, len(proxy_chain_config["node_order"]))
+        with ThreadPoolExecutor(max_workers=window) as executor:
+            futures = [
+                executor.submit(
+                    self.send_data_through_distributed_proxy_chain,
+                    packet,
+                    proxy_chain_config,
+                    final_destination,
+                )
+                for packet in packets
+            ]
+            return [future.result() for future in futures]
+
     def close_connection(self):
         """Closes the connection to the primary node."""
         if self.connection:
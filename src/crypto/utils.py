@@ -1,4 +1,5 @@
 
+import functools
 import hashlib
 
 from cryptography.fernet import Fernet
@@ -50,6 +51,24 @@ def generate_pgp_key(name: str, email: str) -> tuple[pgpy.PGPKey, pgpy.PGPKey]:
     return key, key.pubkey
 
 
+@functools.lru_cache(maxsize=256)
+def _load_pgp_pubkey_cached(blob: bytes) -> pgpy.PGPKey:
+    key, _ = pgpy.PGPKey.from_blob(blob)
+    return key
+
+
+def load_pgp_pubkey(blob: bytes | str) -> pgpy.PGPKey:
+    """Parses an armored PGP public key, reusing parsed keys for repeated blobs.
+
+    Armored key parsing (base64 + packet decode) is expensive; hot paths such
+    as per-hop forwarding resolve the same next-hop key for every message, so
+    parsed keys are memoized by blob.
+    """
+    if isinstance(blob, str):
+        blob = blob.encode("utf-8")
+    return _load_pgp_pubkey_cached(blob)
+
+
 def encrypt_pgp(data: bytes, pub_key: pgpy.PGPKey) -> bytes:
     """Encrypts data using a PGP public key."""
     message = pgpy.PGPMessage.new(data)
@@ -65,18 +84,25 @@ def decrypt_pgp(data: bytes, priv_key: pgpy.PGPKey) -> bytes:
 
 
 # Digital shift cipher ------------------------------------------------------
+@functools.lru_cache(maxsize=256)
+def shift_translation_table(shift: int) -> bytes:
+    """256-entry translation table adding `shift` to every byte value."""
+    return bytes((i + shift) % 256 for i in range(256))
+
+
 def digital_shift_cipher(data: bytes, shift: int) -> bytes:
     """Applies a reversible byte-wise shift cipher."""
-    if shift == 0:
-        return data
-    # Constrain shift to a single byte range to avoid huge loops
+    # Constrain shift to a single byte range; bytes.translate runs the whole
+    # buffer through one C-level table lookup instead of a per-byte loop.
     effective_shift = shift % 256
-    return bytes((byte + effective_shift) % 256 for byte in data)
+    if effective_shift == 0:
+        return data
+    return data.translate(shift_translation_table(effective_shift))
 
 
 def reverse_digital_shift_cipher(data: bytes, shift: int) -> bytes:
     """Reverse operation for digital_shift_cipher."""
-    if shift == 0:
-        return data
     effective_shift = shift % 256
-    return bytes((byte - effective_shift) % 256 for byte in data)
+    if effective_shift == 0:
+        return data
+    return data.translate(shift_translation_table(256 - effective_shift))
@@ -1,6 +1,8 @@
 import socket
 import socks
 
+from src.network import wire
+
 class ClientConnection:
     """A simple TCP client connection, with optional SOCKS proxy support."""
 
@@ -21,9 +23,8 @@ class ClientConnection:
         print(f"Connected to {self.host}:{self.port}")
 
     def send_data(self, data: bytes) -> bytes:
-        self.socket.sendall(data)
-        response = self.socket.recv(4096)
-        return response
+        self.socket.sendall(wire.frame(data))
+        return wire.read_frame(self.socket)
 
     def close(self):
-        self.socket.close()
\ No newline at end of file
+        self.socket.close()
@@ -0,0 +1,199 @@
+
+import queue
+import socket
+import struct
+import threading
+from typing import Dict, Optional, Tuple
+
+import socks
+
+from src.network import wire
+
+
+class SocksConnectionPool:
+    """Pool of pre-established SOCKS connections to next-hop onion services.
+
+    Tor circuit setup dominates per-message latency, so connections are
+    opened ahead of the send (and replenished in the background) instead of
+    paying the SOCKS CONNECT on the per-message critical path.
+    """
+
+    def __init__(
+        self,
+        socks_host: str = "127.0.0.1",
+        socks_port: int = 9050,
+        pool_size: int = 4,
+        connect_timeout: float = 30.0,
+        optimistic: bool = True,
+    ):
+        self.socks_host = socks_host
+        self.socks_port = socks_port
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.optimistic = optimistic
+
+        self._pools: Dict[str, "queue.Queue[socket.socket]"] = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _pool_for(self, onion_address: str) -> "queue.Queue[socket.socket]":
+        with self._lock:
+            pool = self._pools.get(onion_address)
+            if pool is None:
+                pool = queue.Queue(maxsize=self.pool_size)
+                self._pools[onion_address] = pool
+            return pool
+
+    def _open_connection(self, onion_address: str, port: int = 80) -> socket.socket:
+        sock = socks.socksocket()
+        sock.set_proxy(socks.SOCKS5, self.socks_host, self.socks_port, rdns=True)
+        sock.settimeout(self.connect_timeout)
+        sock.connect((onion_address, port))
+        return sock
+
+    def prewarm(self, onion_address: str, count: Optional[int] = None) -> None:
+        """Opens connections to an onion in the background and parks them."""
+        if self._closed:
+            return
+        pool = self._pool_for(onion_address)
+        needed = (count if count is not None else self.pool_size) - pool.qsize()
+
+        def _fill():
+            try:
+                conn = self._open_connection(onion_address)
+            except Exception:
+                return
+            try:
+                pool.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+        for _ in range(max(0, needed)):
+            threading.Thread(target=_fill, daemon=True).start()
+
+    def acquire(self, onion_address: str) -> socket.socket:
+        """Returns a warm connection if one is parked, else opens a fresh one."""
+        pool = self._pool_for(onion_address)
+        try:
+            conn = pool.get_nowait()
+            # Top the pool back up for the next message.
+            self.prewarm(onion_address, count=1)
+            return conn
+        except queue.Empty:
+            # Miss: connect synchronously but start warming for future sends.
+            self.prewarm(onion_address)
+            return self._open_connection(onion_address)
+
+    def release(self, onion_address: str, conn: socket.socket) -> None:
+        """Parks a still-healthy connection for reuse."""
+        if self._closed:
+            conn.close()
+            return
+        try:
+            self._pool_for(onion_address).put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    @staticmethod
+    def _recv_exact(conn: socket.socket, count: int) -> bytes:
+        chunks = b""
+        while len(chunks) < count:
+            chunk = conn.recv(count - len(chunks))
+            if not chunk:
+                raise ConnectionError("SOCKS proxy closed connection mid-handshake")
+            chunks += chunk
+        return chunks
+
+    def _optimistic_request(self, onion_address: str, payload: bytes, port: int = 80) -> Tuple[socket.socket, bytes]:
+        """Cold-path request that rides the payload along with the handshake.
+
+        The SOCKS5 greeting, CONNECT and application payload go out in a
+        single write; Tor buffers the early data (optimistic data), so the
+        request reaches the onion without waiting a circuit RTT for the
+        CONNECT acknowledgement. Replies are drained afterwards.
+        """
+        host = onion_address.encode("ascii")
+        greeting = b"\x05\x01\x00"  # version 5, one method: no auth
+        connect = b"\x05\x01\x00\x03" + bytes((len(host),)) + host + struct.pack(">H", port)
+
+        conn = socket.create_connection((self.socks_host, self.socks_port), timeout=self.connect_timeout)
+        try:
+            conn.sendall(greeting + connect + wire.frame(payload))
+
+            if self._recv_exact(conn, 2) != b"\x05\x00":
+                raise ConnectionError("SOCKS proxy rejected authentication method")
+            reply = self._recv_exact(conn, 4)
+            if reply[1] != 0x00:
+                raise ConnectionError(f"SOCKS CONNECT failed with code {reply[1]}")
+            atyp = reply[3]
+            if atyp == 0x01:
+                self._recv_exact(conn, 4 + 2)
+            elif atyp == 0x03:
+                domain_len = self._recv_exact(conn, 1)[0]
+                self._recv_exact(conn, domain_len + 2)
+            elif atyp == 0x04:
+                self._recv_exact(conn, 16 + 2)
+            else:
+                raise ConnectionError(f"SOCKS CONNECT returned unknown address type {atyp}")
+
+            response = wire.read_frame(conn)
+            return conn, response
+        except Exception:
+            conn.close()
+            raise
+
+    def request(self, onion_address: str, payload: bytes) -> bytes:
+        """Sends one payload over a pooled connection and returns the response.
+
+        Parked connections can sit idle across a full lock cycle and Tor
+        tears idle circuits down, so popping a dead socket is the expected
+        case rather than the exception: a pooled connection's failure is
+        retried once on a freshly opened one, and only the fresh
+        connection's failure propagates to the caller.
+        """
+        pool = self._pool_for(onion_address)
+        try:
+            conn = pool.get_nowait()
+            # Top the pool back up for the next message.
+            self.prewarm(onion_address, count=1)
+        except queue.Empty:
+            self.prewarm(onion_address)
+            return self._fresh_request(onion_address, payload)
+
+        try:
+            conn.sendall(wire.frame(payload))
+            response = wire.read_frame(conn)
+        except Exception:
+            conn.close()
+            return self._fresh_request(onion_address, payload)
+        self.release(onion_address, conn)
+        return response
+
+    def _fresh_request(self, onion_address: str, payload: bytes) -> bytes:
+        """Runs one request over a newly opened connection; failures propagate."""
+        if self.optimistic:
+            conn, response = self._optimistic_request(onion_address, payload)
+            self.release(onion_address, conn)
+            return response
+        conn = self._open_connection(onion_address)
+        try:
+            conn.sendall(wire.frame(payload))
+            response = wire.read_frame(conn)
+        except Exception:
+            conn.close()
+            raise
+        self.release(onion_address, conn)
+        return response
+
+    def close(self) -> None:
+        """Closes every parked connection."""
+        self._closed = True
+        with self._lock:
+            pools = list(self._pools.values())
+            self._pools = {}
+        for pool in pools:
+            while True:
+                try:
+                    pool.get_nowait().close()
+                except queue.Empty:
+                    break
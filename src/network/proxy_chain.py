@@ -1,28 +1,168 @@
 
-from src.crypto.utils import digital_shift_cipher, hash_data
+import functools
+import hashlib
+import queue
+import threading
+from concurrent.futures import Future
+
+from src.crypto.utils import shift_translation_table
+
+
+def run_chain(data: bytes, tables: list, hashers: list) -> bytes:
+    """Runs the whole shift+hash chain over one packet in a tight loop.
+
+    Everything per-hop here (translate, digest) executes in C; the loop
+    itself is the only Python-level dispatch, so a packet pays one call
+    into this kernel instead of one queue hand-off per hop.
+    """
+    for table, hasher_factory in zip(tables, hashers):
+        data = hasher_factory(data.translate(table)).digest()
+    return data
+
 
 class ProxyChain:
-    """Manages the chain of proxy nodes."""
+    """Manages the chain of proxy nodes.
+
+    Per-hop work for a single packet is data-dependent and stays sequential,
+    but packets stream through a pipeline of per-node worker stages joined by
+    bounded queues, so a stream of packets overlaps across the chain.
+
+    The per-hop routing state lives in parallel arrays (shift, translation
+    table, hasher factory) rather than being re-derived from the config dicts,
+    so the hot loop touches only the few bytes it needs per hop.
+    """
 
     def __init__(self, node_configs: dict, node_order: list):
         """Initializes the ProxyChain with node configurations and order."""
         self.node_configs = node_configs
         self.node_order = node_order
 
-    def process_data(self, data: bytes) -> bytes:
-        """Processes data through the proxy chain."""
-        processed_data = data
+        self._pipeline_lock = threading.Lock()
+        self._stage_queues: list["queue.Queue"] = []
+        self._stage_threads: list[threading.Thread] = []
+        self._config_cache: dict | None = None
+
+        self._shifts: list[int] = []
+        self._xlate_tables: list[bytes] = []
+        self._hashers: list = []
+        self._build_hop_arrays()
+
+    # ---------------------------------------------------------- Hop arrays --
+    def _build_hop_arrays(self) -> None:
+        """Derives the per-hop parallel arrays from the node configs."""
+        shifts, tables, hashers = [], [], []
         for node_id in self.node_order:
-            config = self.node_configs[node_id]
+            config = self.node_configs.get(node_id)
+            if not config:
+                continue
             shift = sum(ord(ch) for ch in config["keyword"])
-            shifted = digital_shift_cipher(processed_data, shift)
-            processed_data = hash_data(shifted, config["hashing_algorithm"])
-        return processed_data
+            shifts.append(shift)
+            tables.append(shift_translation_table(shift % 256))
+            hashers.append(functools.partial(hashlib.new, config["hashing_algorithm"]))
+        self._shifts = shifts
+        self._xlate_tables = tables
+        self._hashers = hashers
 
+    # ------------------------------------------------------------- Pipeline --
+    def _stage_worker(self, table: bytes, hasher_factory, in_queue: "queue.Queue", out_queue) -> None:
+        while True:
+            item = in_queue.get()
+            if item is None:
+                # Cascade shutdown to the next stage.
+                if out_queue is not None:
+                    out_queue.put(None)
+                return
+            data, future = item
+            try:
+                processed = hasher_factory(data.translate(table)).digest()
+            except Exception as exc:
+                future.set_exception(exc)
+                continue
+            if out_queue is None:
+                future.set_result(processed)
+            else:
+                out_queue.put((processed, future))
+
+    def _ensure_pipeline(self) -> None:
+        with self._pipeline_lock:
+            if self._stage_threads:
+                return
+            if not self._shifts:
+                self._build_hop_arrays()
+            queues = [queue.Queue(maxsize=8) for _ in self._shifts]
+            threads = []
+            for i, (table, hasher_factory) in enumerate(zip(self._xlate_tables, self._hashers)):
+                out_queue = queues[i + 1] if i + 1 < len(queues) else None
+                thread = threading.Thread(
+                    target=self._stage_worker,
+                    args=(table, hasher_factory, queues[i], out_queue),
+                    daemon=True,
+                )
+                thread.start()
+                threads.append(thread)
+            self._stage_queues = queues
+            self._stage_threads = threads
+
+    def _shutdown_pipeline(self) -> None:
+        with self._pipeline_lock:
+            if self._stage_queues:
+                self._stage_queues[0].put(None)
+            self._stage_queues = []
+            self._stage_threads = []
+
+    # ------------------------------------------------------------ Data path --
+    def submit(self, data: bytes) -> Future:
+        """Feeds one packet into the pipeline; resolves with the chain output."""
+        future = Future()
+        if not self.node_order:
+            future.set_result(data)
+            return future
+        self._ensure_pipeline()
+        if not self._stage_queues:
+            future.set_result(data)
+            return future
+        self._stage_queues[0].put((data, future))
+        return future
+
+    def process_data(self, data: bytes) -> bytes:
+        """Processes one packet through the proxy chain synchronously.
+
+        Single packets skip the streaming pipeline and run the chain
+        kernel inline; use submit() to overlap a stream of packets.
+        """
+        if not self._shifts:
+            self._build_hop_arrays()
+        return run_chain(data, self._xlate_tables, self._hashers)
+
+    # ---------------------------------------------------------- Config view --
     def get_node_configs(self) -> dict:
-        """Returns the current configuration of all nodes in the chain."""
-        return self.node_configs
+        """Returns a cached snapshot of all node configurations in the chain.
+
+        The snapshot is rebuilt only after a config change, so repeated
+        callers (one per client payload request) get an O(1) read.
+        """
+        if self._config_cache is None:
+            self._config_cache = dict(self.node_configs)
+        return self._config_cache
 
     def update_node_configs(self, new_node_configs: dict):
         """Updates the configuration of nodes in the chain."""
         self.node_configs.update(new_node_configs)
+        self._config_cache = None
+        self._build_hop_arrays()
+        # Stages bake the hop state in; rebuild lazily on next submit.
+        self._shutdown_pipeline()
+
+    def update(self, node_configs: dict, node_order: list) -> None:
+        """Swaps in a new cycle's configs and order, reusing this instance.
+
+        Replacing the whole ProxyChain on rotation leaked the old pipeline's
+        stage threads (parked on their queues forever); updating in place
+        shuts the old stages down and rebuilds derived state for the new
+        configuration.
+        """
+        self.node_configs = dict(node_configs)
+        self.node_order = list(node_order)
+        self._config_cache = None
+        self._build_hop_arrays()
+        self._shutdown_pipeline()
@@ -1,70 +1,115 @@
 
-import socket
-import threading
-from typing import Callable, List, Tuple
+import asyncio
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from src.network import wire
+
+# Plain-HTTP clients (curl against the primary node) send no length prefix;
+# sniff the first four bytes for a method token to keep serving them.
+_HTTP_METHOD_PREFIXES = (b"GET ", b"POST", b"HEAD", b"PUT ", b"DELE", b"OPTI", b"PATC")
+_CONTENT_LENGTH_RE = re.compile(rb"content-length:\s*(\d+)", re.IGNORECASE)
 
 
 class Server:
-    """Basic TCP server with pluggable handler."""
+    """Basic TCP server with pluggable handler, served from one asyncio loop.
+
+    A single event loop multiplexes all client connections instead of one
+    thread per accepted socket; handler callbacks (which may do blocking
+    crypto work) run on a bounded executor so the loop stays responsive.
+    """
 
-    def __init__(self, host: str, port: int, handler: Callable[[bytes], bytes]):
+    def __init__(self, host: str, port: int, handler: Callable[[bytes], bytes], max_workers: int = 8):
         self.host = host
         self.port = port
         self.handler = handler
 
-        self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        self.server_socket.settimeout(1.0)
-
         self.running = False
-        self._client_threads: List[threading.Thread] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stop_event: Optional[asyncio.Event] = None
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="server-handler")
 
     def serve_forever(self) -> None:
-        self.server_socket.bind((self.host, self.port))
-        self.port = self.server_socket.getsockname()[1]
-        self.server_socket.listen(16)
+        asyncio.run(self._serve())
+
+    async def _serve(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._stop_event = asyncio.Event()
+
+        server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        self.port = server.sockets[0].getsockname()[1]
         self.running = True
         print(f"Server listening on {self.host}:{self.port}")
 
         try:
-            while self.running:
-                try:
-                    conn, addr = self.server_socket.accept()
-                except socket.timeout:
-                    continue
-                except OSError:
-                    break
-
-                client_thread = threading.Thread(
-                    target=self.handle_client,
-                    args=(conn, addr),
-                    daemon=True,
-                )
-                client_thread.start()
-                self._client_threads.append(client_thread)
+            async with server:
+                await self._stop_event.wait()
         finally:
             self.running = False
-            self.server_socket.close()
+            self._executor.shutdown(wait=False)
 
-    def handle_client(self, conn: socket.socket, addr: Tuple[str, int]) -> None:
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        addr = writer.get_extra_info("peername")
         print(f"Accepted connection from {addr}")
-        with conn:
+        try:
             while self.running:
                 try:
-                    data = conn.recv(4096)
-                    if not data:
-                        break
-                    response = self.handler(data)
-                    conn.sendall(response)
-                except OSError:
+                    header = await reader.readexactly(wire.FRAME_HEADER.size)
+                except asyncio.IncompleteReadError:
                     break
 
+                if header in _HTTP_METHOD_PREFIXES:
+                    data = await self._read_http_request(reader, header)
+                    response = await self._loop.run_in_executor(self._executor, self.handler, data)
+                    writer.write(response)
+                    await writer.drain()
+                    # HTTP responses advertise Connection: close; honor it.
+                    break
+
+                (length,) = wire.FRAME_HEADER.unpack(header)
+                if length > wire.MAX_FRAME_SIZE:
+                    break
+                data = await reader.readexactly(length)
+                response = await self._loop.run_in_executor(self._executor, self.handler, data)
+                writer.write(wire.frame(response))
+                await writer.drain()
+        except (ConnectionResetError, OSError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+
+    @staticmethod
+    async def _read_http_request(reader: asyncio.StreamReader, initial: bytes) -> bytes:
+        """Reads one unframed HTTP request (headers plus Content-Length body)."""
+        data = bytearray(initial)
+        while b"\r\n\r\n" not in data and b"\n\n" not in data:
+            chunk = await reader.read(65536)
+            if not chunk:
+                return bytes(data)
+            data += chunk
+
+        separator = b"\r\n\r\n" if b"\r\n\r\n" in data else b"\n\n"
+        header_end = data.index(separator) + len(separator)
+        match = _CONTENT_LENGTH_RE.search(data[:header_end])
+        content_length = int(match.group(1)) if match else 0
+
+        while len(data) - header_end < content_length:
+            chunk = await reader.read(65536)
+            if not chunk:
+                break
+            data += chunk
+        return bytes(data)
+
     def stop(self) -> None:
         self.running = False
-        try:
-            self.server_socket.shutdown(socket.SHUT_RDWR)
-        except OSError:
-            pass
-        self.server_socket.close()
-        for thread in self._client_threads:
-            thread.join(timeout=1)
+        loop = self._loop
+        if loop and self._stop_event and not loop.is_closed():
+            try:
+                loop.call_soon_threadsafe(self._stop_event.set)
+            except RuntimeError:
+                pass
@@ -1,21 +1,92 @@
-import json
+import functools
+import hashlib
+import os
 import threading
 import time
-from typing import Optional, Tuple
+from pathlib import Path
+from typing import Dict, Optional, Tuple
 
 import pgpy
-from stem.control import Controller
+from stem.control import Controller, EventType
 
 from src.crypto.utils import (
     decrypt_pgp,
-    digital_shift_cipher,
-    encrypt_pgp,
     generate_pgp_key,
-    hash_data,
+    shift_translation_table,
 )
+from src.network import wire
+from src.network.connection_pool import SocksConnectionPool
 from src.network.server import Server
 
 
+# Envelope shapes are fixed between rotations, so their framing is baked
+# once; per-packet envelope construction is then pure concatenation.
+_FORWARD_TEMPLATE = wire.EnvelopeTemplate({}, bin_field="encrypted_data")
+_FINAL_TEMPLATE = wire.EnvelopeTemplate({"status": "final_processed"}, bin_field="data")
+
+# PGP key generation takes seconds per key and logical node_ids recur on
+# every lock-cycle rotation, so keypairs are generated once per node_id and
+# reused for the life of the process.
+_pgp_key_cache: Dict[str, Tuple[pgpy.PGPKey, pgpy.PGPKey, str]] = {}
+_pgp_key_cache_lock = threading.Lock()
+
+# One authenticated control connection per tor instance, shared by every
+# Node in the process; ADD_ONION calls multiplex over it, so K nodes don't
+# pay K cookie-auth round trips or hold K control-port FDs.
+_shared_controllers: Dict[int, Controller] = {}
+_shared_controllers_lock = threading.Lock()
+
+# Publication signalling: tor announces descriptor uploads as HS_DESC
+# events, so waiters block on a per-service Event the listener sets
+# instead of polling onions/current over the control channel.
+_hs_desc_events: Dict[str, threading.Event] = {}
+_hs_desc_events_lock = threading.Lock()
+
+
+def _hs_publication_event(service_id: str) -> threading.Event:
+    """Returns the shared publication Event for a hidden service id."""
+    with _hs_desc_events_lock:
+        return _hs_desc_events.setdefault(service_id, threading.Event())
+
+
+def _on_hs_desc(event) -> None:
+    if getattr(event, "action", None) == "UPLOADED":
+        _hs_publication_event(event.address).set()
+
+
+_hs_listener_controllers: set = set()
+
+
+def _attach_hs_listener(controller: Controller) -> None:
+    """Registers the HS_DESC listener on a controller exactly once."""
+    with _hs_desc_events_lock:
+        if id(controller) in _hs_listener_controllers:
+            return
+        _hs_listener_controllers.add(id(controller))
+    try:
+        controller.add_event_listener(_on_hs_desc, EventType.HS_DESC)
+    except Exception:
+        # Waiters fall back to their timeout if events are unavailable.
+        with _hs_desc_events_lock:
+            _hs_listener_controllers.discard(id(controller))
+
+
+def _get_shared_controller(control_port: int, password: Optional[str] = None) -> Controller:
+    """Returns the process-wide controller for a control port, connecting once."""
+    with _shared_controllers_lock:
+        controller = _shared_controllers.get(control_port)
+        if controller is not None and controller.is_alive():
+            return controller
+        controller = Controller.from_port(port=control_port)
+        if password:
+            controller.authenticate(password=password)
+        else:
+            controller.authenticate()
+        _attach_hs_listener(controller)
+        _shared_controllers[control_port] = controller
+        return controller
+
+
 class Node:
     """Distributed node that participates in the proxy chain."""
 
@@ -29,15 +100,25 @@ class Node:
         tor_control_port: int = 9051,
         tor_control_password: Optional[str] = None,
         pgp_key_passphrase: Optional[str] = None,
+        tor_socks_host: str = "127.0.0.1",
+        tor_socks_port: int = 9050,
+        single_hop: bool = False,
+        controller: Optional[Controller] = None,
     ):
         self.node_id = node_id
-        self.keyword = keyword
-        self.hashing_algorithm = hashing_algorithm
+        self.set_new_config(keyword, hashing_algorithm)
         self.host = host
         self.port = port
         self.tor_control_port = tor_control_port
         self.tor_control_password = tor_control_password
         self.pgp_key_passphrase = pgp_key_passphrase
+        self.tor_socks_host = tor_socks_host
+        self.tor_socks_port = tor_socks_port
+        # Single-hop onion services drop ~2 of the 3 service-side circuit
+        # hops; only for middle nodes whose location needs no hiding, and
+        # only on a tor instance dedicated to non-anonymous services.
+        self.single_hop = single_hop
+        self.forward_pool = SocksConnectionPool(tor_socks_host, tor_socks_port)
 
         self.server: Optional[Server] = None
         self.server_thread: Optional[threading.Thread] = None
@@ -46,26 +127,44 @@ class Node:
         self.tor_controller: Optional[Controller] = None
         self.hidden_service_id: Optional[str] = None
         self.onion_address: Optional[str] = None
-
-        self.pgp_key, self.pgp_pubkey = self._generate_pgp_keypair()
-        self._connect_to_tor_controller()
+        # Set once the hidden service descriptor is confirmed published.
+        self.publication_event = threading.Event()
+        # Set once the node is usable: server accepting, and either the
+        # onion published or tor confirmed unavailable. Callers wait on
+        # this instead of sleeping a fixed grace period.
+        self.ready_event = threading.Event()
+
+        self.pgp_key, self.pgp_pubkey, self.pgp_pubkey_armored = self._generate_pgp_keypair()
+        if controller is not None and controller.is_alive():
+            # Caller-supplied controller (e.g. the primary node's): reuse it
+            # instead of opening another authenticated control connection.
+            _attach_hs_listener(controller)
+            self.tor_controller = controller
+        else:
+            self._connect_to_tor_controller()
 
     # ------------------------------------------------------------------ PGP --
-    def _generate_pgp_keypair(self) -> Tuple[pgpy.PGPKey, pgpy.PGPKey]:
+    def _generate_pgp_keypair(self) -> Tuple[pgpy.PGPKey, pgpy.PGPKey, str]:
+        with _pgp_key_cache_lock:
+            cached = _pgp_key_cache.get(self.node_id)
+        if cached:
+            return cached
+
         name = f"Node {self.node_id}"
         email = f"{self.node_id}@ghostcomm.onion"
         key, pubkey = generate_pgp_key(name, email)
-        return key, pubkey
+        # ASCII-armoring re-runs in full on every str(); bake it alongside
+        # the keypair so config builds read a string instead of re-armoring.
+        armored = str(pubkey)
+        with _pgp_key_cache_lock:
+            _pgp_key_cache.setdefault(self.node_id, (key, pubkey, armored))
+        return key, pubkey, armored
 
     # ------------------------------------------------------------------- Tor --
     def _connect_to_tor_controller(self) -> None:
         try:
-            self.tor_controller = Controller.from_port(port=self.tor_control_port)
-            if self.tor_control_password:
-                self.tor_controller.authenticate(password=self.tor_control_password)
-            else:
-                self.tor_controller.authenticate()
-            print(f"Node {self.node_id}: Connected to Tor controller on port {self.tor_control_port}.")
+            self.tor_controller = _get_shared_controller(self.tor_control_port, self.tor_control_password)
+            print(f"Node {self.node_id}: Using Tor controller on port {self.tor_control_port}.")
         except Exception as exc:
             print(
                 f"Node {self.node_id}: Warning: unable to connect to Tor control port {self.tor_control_port}: {exc}. "
@@ -73,6 +172,31 @@ class Node:
             )
             self.tor_controller = None
 
+    def _hs_key_path(self) -> Path:
+        return Path(os.path.expanduser("~/.ghostcomm/nodes")) / f"{self.node_id}.key"
+
+    def _load_persisted_hs_key(self) -> Optional[Tuple[str, str]]:
+        """Returns (key_type, key_content) for a previously persisted onion key."""
+        key_path = self._hs_key_path()
+        try:
+            stored = key_path.read_text(encoding="utf-8").strip()
+        except OSError:
+            return None
+        if ":" not in stored:
+            return None
+        key_type, key_content = stored.split(":", 1)
+        return key_type, key_content
+
+    def _persist_hs_key(self, key_type: str, key_content: str) -> None:
+        key_path = self._hs_key_path()
+        try:
+            key_path.parent.mkdir(parents=True, exist_ok=True)
+            key_path.touch(mode=0o600, exist_ok=True)
+            key_path.write_text(f"{key_type}:{key_content}\n", encoding="utf-8")
+            os.chmod(key_path, 0o600)
+        except OSError as exc:
+            print(f"Node {self.node_id}: Warning: could not persist onion key to {key_path}: {exc}")
+
     def _create_ephemeral_service(
         self,
         local_port: int,
@@ -82,40 +206,87 @@ class Node:
         if not self.tor_controller:
             return None
 
+        if self.single_hop:
+            self._enable_single_hop_mode()
+
         try:
+            # Reusing a persisted key skips fresh key generation and lets the
+            # previously published descriptor shortcut the publication wait.
+            persisted = self._load_persisted_hs_key()
+            if persisted:
+                key_type, key_content = persisted
+            else:
+                key_type, key_content = "NEW", "ED25519-V3"
+
             service = self.tor_controller.create_ephemeral_hidden_service(
                 {80: local_port},
-                key_type="NEW",
-                key_content="ED25519-V3",
+                key_type=key_type,
+                key_content=key_content,
                 await_publication=await_publication,
             )
             service_id = service.service_id
             onion = f"{service_id}.onion"
 
-            if not await_publication:
-                deadline = time.time() + publish_timeout
-                published = False
-                while time.time() < deadline:
-                    info = self.tor_controller.get_info("onions/current", "")
-                    if service_id in info:
-                        published = True
-                        break
-                    time.sleep(0.25)
-                if not published:
-                    self.tor_controller.remove_ephemeral_hidden_service(service_id)
-                    print(
-                        f"Node {self.node_id}: Hidden service {onion} failed to publish within {publish_timeout}s."
-                    )
-                    return None
+            if not persisted and getattr(service, "private_key", None):
+                self._persist_hs_key(service.private_key_type, service.private_key)
 
             self.hidden_service_id = service_id
             self.onion_address = onion
-            print(f"Node {self.node_id}: Ephemeral hidden service published at {onion} (local {local_port}).")
+
+            if await_publication:
+                self.publication_event.set()
+                self.ready_event.set()
+                print(f"Node {self.node_id}: Ephemeral hidden service published at {onion} (local {local_port}).")
+            else:
+                # A middle hop only needs its onion reachable before the first
+                # forward, so don't stall startup on descriptor publication;
+                # watch for it in the background instead.
+                print(f"Node {self.node_id}: Ephemeral hidden service created at {onion} (local {local_port}); publication pending.")
+                threading.Thread(
+                    target=self._await_publication,
+                    args=(service_id, publish_timeout),
+                    daemon=True,
+                ).start()
             return onion
         except Exception as exc:
             print(f"Node {self.node_id}: Error creating hidden service on port {local_port}: {exc}")
             return None
 
+    def _enable_single_hop_mode(self) -> None:
+        """Configures tor for single-hop (non-anonymous) onion services.
+
+        Tor applies these options instance-wide and refuses them alongside a
+        client SocksPort, so this only succeeds on a dedicated tor daemon;
+        failure is logged and the service falls back to a full 3-hop circuit.
+        """
+        if not self.tor_controller:
+            return
+        try:
+            self.tor_controller.set_options({
+                "HiddenServiceSingleHopMode": "1",
+                "HiddenServiceNonAnonymousMode": "1",
+            })
+            print(f"Node {self.node_id}: Single-hop onion service mode enabled.")
+        except Exception as exc:
+            print(
+                f"Node {self.node_id}: Warning: could not enable single-hop mode: {exc}. "
+                "Continuing with a standard 3-hop onion service."
+            )
+
+    def _await_publication(self, service_id: str, publish_timeout: float) -> None:
+        """Background watcher that signals when the descriptor is published.
+
+        Blocks on the HS_DESC UPLOADED event for the service rather than
+        polling the control channel.
+        """
+        if _hs_publication_event(service_id).wait(publish_timeout):
+            if self.hidden_service_id == service_id:
+                self.publication_event.set()
+                self.ready_event.set()
+                print(f"Node {self.node_id}: Hidden service {service_id}.onion publication confirmed.")
+            return
+        print(f"Node {self.node_id}: Hidden service {service_id}.onion not confirmed published within {publish_timeout}s.")
+
     def _remove_ephemeral_service(self) -> None:
         if not self.tor_controller or not self.hidden_service_id:
             return
@@ -128,6 +299,8 @@ class Node:
         except Exception as exc:
             print(f"Node {self.node_id}: Warning: failed to remove hidden service {self.hidden_service_id}: {exc}")
         finally:
+            with _hs_desc_events_lock:
+                _hs_desc_events.pop(self.hidden_service_id, None)
             self.hidden_service_id = None
             self.onion_address = None
 
@@ -155,7 +328,11 @@ class Node:
         self.port = self.server.port
 
         if self.tor_controller:
-            self._create_ephemeral_service(self.port)
+            self._create_ephemeral_service(self.port, await_publication=False)
+        if not self.onion_address:
+            # No onion coming; the server itself is accepting, so don't
+            # leave ready_event waiters hanging until their timeout.
+            self.ready_event.set()
 
     def stop_server(self) -> None:
         self.running = False
@@ -163,67 +340,73 @@ class Node:
             self.server.stop()
         if self.server_thread and self.server_thread.is_alive():
             self.server_thread.join(timeout=2)
+        self.forward_pool.close()
         self._remove_ephemeral_service()
-        if self.tor_controller:
-            try:
-                self.tor_controller.close()
-            except Exception:
-                pass
+        # The controller is shared process-wide; dropping the reference is
+        # enough, other nodes may still be multiplexing over it.
+        self.tor_controller = None
 
     # ----------------------------------------------------------- Data plane --
     def handle_incoming_data(self, data: bytes) -> bytes:
         try:
-            request_payload = json.loads(data.decode("utf-8"))
-            encrypted_data_for_this_node_hex = request_payload["encrypted_data"]
-            next_hop_onion = request_payload.get("next_hop_onion")
-            next_hop_pubkey_pem = request_payload.get("next_hop_pubkey")
-            final_destination = request_payload.get("final_destination")
+            request_payload = wire.unpack(data)
+            encrypted_blob = request_payload["encrypted_data"]
 
-            encrypted_blob = bytes.fromhex(encrypted_data_for_this_node_hex)
             decrypted_layer = decrypt_pgp(encrypted_blob, self.pgp_key)
-            layer_payload = json.loads(decrypted_layer.decode("utf-8"))
-            original_data = bytes.fromhex(layer_payload["original_data"])
+            layer_payload = wire.unpack(decrypted_layer)
+            original_data = layer_payload["original_data"]
+            # Routing lives inside our encrypted layer: the client (or the
+            # previous hop) tells us where the inner ciphertext goes next.
+            next_hop_onion = layer_payload.get("next_hop_onion")
+            final_destination = layer_payload.get("final_destination")
+
+            if next_hop_onion:
+                # original_data is the inner layer, already encrypted for the
+                # next node; relay it over a pooled SOCKS connection.
+                envelope = _FORWARD_TEMPLATE.build(original_data)
+                try:
+                    print(f"Node {self.node_id}: Forwarding to next hop {next_hop_onion}.")
+                    return self.forward_pool.request(next_hop_onion, envelope)
+                except Exception as exc:
+                    # Without a reachable Tor SOCKS proxy, hand the inner
+                    # envelope back upstream instead of relaying it ourselves.
+                    print(f"Node {self.node_id}: Could not relay to {next_hop_onion} ({exc}); returning envelope upstream.")
+                    return wire.pack(
+                        {
+                            "status": "forwarded",
+                            "encrypted_data": original_data,
+                            "next_hop_onion": next_hop_onion,
+                            "final_destination": final_destination,
+                        }
+                    )
 
             processed_data = self.process_data(original_data)
 
-            if next_hop_onion and next_hop_pubkey_pem:
-                next_hop_pubkey, _ = pgpy.PGPKey.from_blob(next_hop_pubkey_pem.encode("utf-8"))
-                data_for_next_hop = {
-                    "original_data": processed_data.hex(),
-                    "next_hop_onion": next_hop_onion,
-                    "next_hop_pubkey": next_hop_pubkey_pem,
-                    "final_destination": final_destination,
-                }
-                encrypted_next_blob = encrypt_pgp(json.dumps(data_for_next_hop).encode("utf-8"), next_hop_pubkey)
-                print(f"Node {self.node_id}: Forwarding to next hop {next_hop_onion}.")
-                return json.dumps(
-                    {
-                        "status": "forwarded",
-                        "encrypted_data": encrypted_next_blob.hex(),
-                        "next_hop_onion": next_hop_onion,
-                        "final_destination": final_destination,
-                    }
-                ).encode("utf-8")
-
             if final_destination:
                 print(f"Node {self.node_id}: Final hop reached for {final_destination}.")
             else:
                 print(f"Node {self.node_id}: Final hop reached (no destination set).")
 
-            return json.dumps({"status": "final_processed", "data": processed_data.hex()}).encode("utf-8")
+            return _FINAL_TEMPLATE.build(processed_data)
         except Exception as exc:
             print(f"Node {self.node_id}: Error handling data: {exc}")
-            return json.dumps({"status": "error", "message": str(exc)}).encode("utf-8")
+            return wire.pack({"status": "error", "message": str(exc)})
 
     def process_data(self, data: bytes) -> bytes:
-        shift = self.get_keyword_shift()
-        shifted = digital_shift_cipher(data, shift)
-        return hash_data(shifted, self.hashing_algorithm)
+        shifted = data.translate(self._xlate)
+        return self._hasher_factory(shifted).digest()
 
     # -------------------------------------------------------- Config update --
     def get_keyword_shift(self) -> int:
-        return sum(ord(ch) for ch in self.keyword)
+        return self._shift
 
     def set_new_config(self, keyword: str, hashing_algorithm: str) -> None:
         self.keyword = keyword
         self.hashing_algorithm = hashing_algorithm
+        # Bake the keyword into a shift and translation table once, instead of
+        # re-summing the keyword and shifting byte-by-byte per packet.
+        self._shift = sum(ord(ch) for ch in keyword)
+        self._xlate = shift_translation_table(self._shift % 256)
+        # Bound hashlib constructor up front; hashlib dispatches straight to
+        # OpenSSL EVP, so per-packet cost is one context plus one update.
+        self._hasher_factory = functools.partial(hashlib.new, hashing_algorithm)
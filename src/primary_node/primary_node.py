@@ -1,8 +1,10 @@
 # src/primary_node/primary_node.py
-import json
+import concurrent.futures
+import functools
+import hashlib
 import mimetypes
 import os
-import random
+import secrets
 import subprocess
 import threading
 import time
@@ -14,11 +16,29 @@ import socks
 
 from stem.control import Controller
 from src.crypto.utils import generate_aes_key, encrypt_aes, encrypt_pgp
+from src.network import wire
 from src.network.server import Server
 from src.network.proxy_chain import ProxyChain
 from src.node.node import Node
 
 
+# Static routing vocabulary, built once instead of re-running the f-string
+# machinery on every rotation.
+_KEYWORDS = tuple(f"keyword_{i}" for i in range(8))
+_HASHING_ALGORITHMS = ("sha256", "sha512", "sha3_256")
+
+
+@functools.lru_cache(maxsize=1024)
+def _parse_client_key(client_pub_key_pem: bytes) -> pgpy.PGPKey:
+    """Parses (and caches) a client's armored PGP public key.
+
+    Returning clients present the same key every payload request; armor
+    parsing is the expensive part, so it is paid once per distinct key.
+    """
+    client_pub_key, _ = pgpy.PGPKey.from_blob(client_pub_key_pem)
+    return client_pub_key
+
+
 class PrimaryNode:
     """Primary node that creates 6 fresh ephemeral .onion services each lock-cycle."""
 
@@ -35,8 +55,11 @@ class PrimaryNode:
     ):
         self.host = host
         self.port = port
-        self.node_keywords = [f"keyword_{i}" for i in range(8)]
-        self.hashing_algorithms = ["sha256", "sha512", "sha3_256"]
+        # OS-entropy RNG: right strength for routing decisions, and no
+        # shared global Mersenne Twister lock on the rotation path.
+        self._rng = secrets.SystemRandom()
+        self.node_keywords = _KEYWORDS
+        self.hashing_algorithms = _HASHING_ALGORITHMS
         self.project_root = Path(__file__).resolve().parents[2]
 
         # initial proxy chain configuration (will be replaced on first lock cycle)
@@ -50,6 +73,8 @@ class PrimaryNode:
         # threading / runtime control
         self.lock_cycle_thread = None
         self.running = False
+        # Interrupts the lock-cycle worker's sleep on shutdown.
+        self._stop_event = threading.Event()
 
         # Tor controller and ephemeral hidden services bookkeeping
         self.tor_control_port = tor_control_port
@@ -58,7 +83,25 @@ class PrimaryNode:
         # self.hidden_services maps service_id -> onion_addr (string)
         self.hidden_services: Dict[str, str] = {}
         self.distributed_nodes: Dict[str, Node] = {}
+        # Next cycle's nodes, built in the background during the idle window.
+        self._pregenerated_nodes: Dict[str, Node] = {}
+        self._pregen_lock = threading.Lock()
+        self._pregen_thread: Optional[threading.Thread] = None
+        self._cycle_generation = 0
+        # Node-id lists per (count, generation parity); the sets recur every
+        # other cycle, so they are built once and copied.
+        self._node_id_pool: Dict[Tuple[int, int], list] = {}
+        # Serialized payload body, identical for every client within a cycle.
+        self._payload_bytes_cache: Optional[Tuple[int, bytes]] = None
+        self._payload_cache_lock = threading.Lock()
+        # Single-flight map for payload builds, keyed by
+        # (cycle generation, sha256 of the client key); cleared on rotation.
+        self._inflight: Dict[Tuple[int, bytes], Tuple[threading.Event, list]] = {}
+        self._inflight_lock = threading.Lock()
         self.onion_address: Optional[str] = None
+        # Set once the startup onion bring-up has resolved (published or
+        # unavailable), so callers can wait on it instead of polling.
+        self.onion_ready = threading.Event()
         self.tor_socks_host = tor_socks_host
         self.tor_socks_port = tor_socks_port
         default_pubkey_path = Path(payload_pubkey_path or os.path.join(os.path.expanduser("~"), ".AUTH", "Z3R0-public-key.asc"))
@@ -110,8 +153,10 @@ class PrimaryNode:
                 published = False
                 while time.time() < deadline:
                     try:
-                        info = (self.tor_controller.get_info("onions/current") or "")
-                        if service_id in info:
+                        # List-form GETINFO: one control round trip per tick
+                        # regardless of how many keys are checked.
+                        info = self.tor_controller.get_info(["onions/current"])
+                        if service_id in (info.get("onions/current") or ""):
                             published = True
                             break
                     except Exception:
@@ -300,10 +345,10 @@ class PrimaryNode:
         if not pubkey_text:
             return False
 
-        request_body = json.dumps({
+        request_body = wire.json_dumps({
             "type": "get_payload",
             "pub_key": pubkey_text,
-        }).encode("utf-8")
+        })
 
         host = self.onion_address
         request_lines = [
@@ -360,8 +405,8 @@ class PrimaryNode:
             return False
 
         try:
-            payload_json = json.loads(body.decode("utf-8"))
-        except json.JSONDecodeError as exc:
+            payload_json = wire.json_loads(body)
+        except ValueError as exc:
             print(f"PrimaryNode: Warning: could not decode payload JSON: {exc}")
             return False
 
@@ -409,79 +454,158 @@ class PrimaryNode:
             print(f"PrimaryNode: Warning: failed to update decrypted payload via helper scripts: {exc}")
 
     # -------------------------- Lock-cycle onion creation --------------------------
-    def create_lock_cycle_onions(self, count: int = 6, local_port: int | None = None, publish_timeout: float = 20.0) -> Dict[str, Tuple[str, str]]:
-        """
-        Create `count` ephemeral .onion services for distributed nodes and update self.proxy_chain_config.
+    def _stop_nodes_parallel(self, nodes: Dict[str, Node], context: str) -> None:
+        """Stops a set of distributed nodes concurrently (best-effort).
 
-        Returns mapping { node_id: (onion_address, service_id) } for successfully created onions.
-        On failure (Tor not connected) returns {}.
+        Each stop carries at least one DEL_ONION round trip over the control
+        channel, so fanning out turns N RTTs into ~one.
         """
-        if local_port is None:
-            local_port = self.port # This will be the PrimaryNode's port for its own onion service
+        if not nodes:
+            return
 
-        if not self.tor_controller:
-            print("PrimaryNode: Tor controller not connected — cannot create onions.")
-            return {}
+        def _safe_stop(item: Tuple[str, Node]) -> None:
+            node_id, node_instance = item
+            try:
+                node_instance.stop_server()
+            except Exception as e:
+                print(f"PrimaryNode: Warning stopping {context} node {node_id}: {e}")
 
-        # 1) Stop and remove previous distributed nodes and their services
-        if self.distributed_nodes:
-            for node_id, node_instance in list(self.distributed_nodes.items()):
-                try:
-                    node_instance.stop_server()
-                except Exception as e:
-                    print(f"PrimaryNode: Warning stopping old distributed node {node_id}: {e}")
-            self.distributed_nodes = {}
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(nodes)) as executor:
+            list(executor.map(_safe_stop, nodes.items()))
 
-        # 2) Create new distributed Node instances and their ephemeral services
-        created_node_info: Dict[str, Dict[str, str]] = {}
-        node_ids = [f"node_{i}" for i in range(count)]
-        random.shuffle(node_ids)
+    def _spawn_cycle_nodes(self, count: int, generation: int, publish_timeout: float = 20.0) -> Dict[str, Node]:
+        """Builds and starts `count` distributed nodes for one cycle generation.
 
-        for node_id in node_ids:
-            # Create a new Node instance
-            # We pass port=0 so the OS assigns a free port for the Node's server
+        Node ids alternate between two banks (generation parity) so a set
+        pregenerated while the previous cycle is still live never collides
+        with the live services' persisted onion keys.
+
+        Bring-up is dominated by Tor publication waits, so the nodes start
+        concurrently: wall-clock cost is ~max(publish latency), not the sum.
+        """
+        pool_key = (count, generation % 2)
+        node_ids = list(self._node_id_pool.setdefault(
+            pool_key, [f"node_{i}_g{generation % 2}" for i in range(count)]
+        ))
+        self._rng.shuffle(node_ids)
+        nodes: Dict[str, Node] = {}
+
+        def _spawn_node(node_id: str) -> Tuple[str, Optional[Node]]:
+            # port=0 lets the OS assign a free port for the Node's server
             node_instance = Node(
                 node_id=node_id,
-                keyword=random.choice(self.node_keywords),
-                hashing_algorithm=random.choice(self.hashing_algorithms),
-                port=0, # Let OS assign a free port
+                keyword=self._rng.choice(self.node_keywords),
+                hashing_algorithm=self._rng.choice(self.hashing_algorithms),
+                port=0,
                 tor_control_port=self.tor_control_port,
-                tor_control_password=self.tor_control_password
+                tor_control_password=self.tor_control_password,
+                tor_socks_host=self.tor_socks_host,
+                tor_socks_port=self.tor_socks_port,
+                controller=self.tor_controller
             )
-            self.distributed_nodes[node_id] = node_instance
-
-            # Start the Node's server and its hidden service
             node_instance.start_server()
-            time.sleep(0.5) # Give the node's server and onion service a moment to start
-
-            if node_instance.onion_address and node_instance.pgp_pubkey:
-                created_node_info[node_id] = {
-                    "onion_address": node_instance.onion_address,
-                    "pgp_pubkey": str(node_instance.pgp_pubkey) # Convert PGPKey object to string for serialization
-                }
-            else:
-                print(f"PrimaryNode: Failed to create ephemeral onion or get pubkey for distributed node {node_id}; continuing")
-                # Clean up the failed node
+            if not node_instance.ready_event.wait(publish_timeout):
+                # The onion exists but its descriptor upload is still
+                # unconfirmed; a cycle must never advertise a hop clients
+                # cannot yet reach, so tear it down and exclude it.
+                print(f"PrimaryNode: Distributed node {node_id} not ready within {publish_timeout}s; dropping it from this cycle")
                 node_instance.stop_server()
-                self.distributed_nodes.pop(node_id)
+                return node_id, None
+            return node_id, node_instance
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=count) as executor:
+            futures = [executor.submit(_spawn_node, node_id) for node_id in node_ids]
+            for future in concurrent.futures.as_completed(futures):
+                try:
+                    node_id, node_instance = future.result()
+                except Exception as e:
+                    print(f"PrimaryNode: Warning: distributed node bring-up failed: {e}")
+                    continue
+
+                if node_instance is None:
+                    continue
+                if node_instance.onion_address and node_instance.pgp_pubkey:
+                    nodes[node_id] = node_instance
+                else:
+                    print(f"PrimaryNode: Failed to create ephemeral onion or get pubkey for distributed node {node_id}; continuing")
+                    # Clean up the failed node
+                    node_instance.stop_server()
+        return nodes
+
+    def _start_pregeneration(self, count: int) -> None:
+        """Builds the next cycle's nodes in the background.
+
+        Runs during the lock-cycle idle window so descriptor publication for
+        the next generation overlaps the current generation's lifetime.
+        """
+        if not self.tor_controller:
+            return
+        with self._pregen_lock:
+            if self._pregen_thread and self._pregen_thread.is_alive():
+                return
+            next_generation = self._cycle_generation + 1
+
+            def _worker():
+                nodes = self._spawn_cycle_nodes(count, next_generation)
+                with self._pregen_lock:
+                    self._pregenerated_nodes = nodes
 
-        # 3) Build node_configs for proxy chain based on created distributed nodes
+            self._pregen_thread = threading.Thread(target=_worker, daemon=True)
+            self._pregen_thread.start()
+
+    def create_lock_cycle_onions(self, count: int = 6, local_port: int | None = None, publish_timeout: float = 20.0) -> Dict[str, Dict[str, str]]:
+        """
+        Create `count` ephemeral .onion services for distributed nodes and update self.proxy_chain_config.
+
+        Returns the node_configs mapping { node_id: {onion_address, pgp_pubkey, keyword, hashing_algorithm} }.
+        On failure (Tor not connected) returns {}.
+        """
+        if local_port is None:
+            local_port = self.port # This will be the PrimaryNode's port for its own onion service
+
+        if not self.tor_controller:
+            print("PrimaryNode: Tor controller not connected — cannot create onions.")
+            return {}
+
+        # 1) Keep the previous generation serving while the new one comes up;
+        # it is torn down only after the chain config has been swapped, so
+        # there is never a window with zero valid onions.
+        old_nodes = self.distributed_nodes
+        self.distributed_nodes = {}
+
+        # 2) Adopt the pregenerated node set when one is ready, otherwise
+        # build a fresh set now. Pregeneration runs during the previous
+        # cycle's idle window, so in steady state the publication latency is
+        # already paid by the time the refresh tick fires. The generation
+        # counter is not bumped yet: payload requests arriving during the
+        # bring-up must keep caching under the generation whose config is
+        # still live.
+        new_generation = self._cycle_generation + 1
+        with self._pregen_lock:
+            new_nodes, self._pregenerated_nodes = self._pregenerated_nodes, {}
+        if new_nodes:
+            print(f"PrimaryNode: Adopting {len(new_nodes)} pregenerated distributed nodes.")
+        else:
+            new_nodes = self._spawn_cycle_nodes(count, new_generation, publish_timeout)
+
+        # 3) Register the new nodes and build node_configs in a single pass
         node_configs: Dict[str, Dict[str, str]] = {}
-        for node_id, info in created_node_info.items():
+        for node_id, node_instance in new_nodes.items():
+            self.distributed_nodes[node_id] = node_instance
             node_configs[node_id] = {
-                "onion_address": info["onion_address"],
-                "pgp_pubkey": info["pgp_pubkey"],
-                "keyword": self.distributed_nodes[node_id].keyword, # Get keyword from the actual node instance
-                "hashing_algorithm": self.distributed_nodes[node_id].hashing_algorithm # Get hashing_algorithm from the actual node instance
+                "onion_address": node_instance.onion_address,
+                "pgp_pubkey": node_instance.pgp_pubkey_armored, # Armored once at key generation
+                "keyword": node_instance.keyword,
+                "hashing_algorithm": node_instance.hashing_algorithm
             }
 
         # If some failed and we need to preserve chain length, add placeholders (though ideally we want all nodes to start)
-        if len(created_node_info) < count:
-            print(f"PrimaryNode: Warning: Only {len(created_node_info)} out of {count} distributed nodes started successfully.")
+        if len(node_configs) < count:
+            print(f"PrimaryNode: Warning: Only {len(node_configs)} out of {count} distributed nodes started successfully.")
 
         # final node order: shuffle to avoid predictable ordering
         final_node_order = list(node_configs.keys())
-        random.shuffle(final_node_order)
+        self._rng.shuffle(final_node_order)
 
         # update proxy_chain_config
         self.proxy_chain_config = {
@@ -496,16 +620,32 @@ class PrimaryNode:
         else:
             self.proxy_chain_config["primary_node_url"] = f"{self.host}:{self.port}" # Fallback to direct address
 
-        # Rebuild proxy chain (this will now be a logical chain of the distributed nodes' info)
-        # The ProxyChain class itself will need to be updated to reflect this change.
-        # For now, we'll keep it as is, but it will be refactored later.
-        self.proxy_chain = ProxyChain(self.proxy_chain_config["node_configs"], self.proxy_chain_config["node_order"])
-        print(f"PrimaryNode: create_lock_cycle_onions: created {len(created_node_info)} distributed nodes, primary_node_url={self.proxy_chain_config['primary_node_url']}")
+        # Swap the new cycle into the existing proxy chain; this also shuts
+        # down the previous cycle's pipeline stages.
+        self.proxy_chain.update(self.proxy_chain_config["node_configs"], self.proxy_chain_config["node_order"])
+
+        # Only now that the new config is live does the generation advance.
+        # Payload bodies and in-flight builds from the bring-up window were
+        # keyed under the old generation (and built from the old config), so
+        # bumping here — plus dropping both caches — guarantees no client is
+        # served a node list referencing the set about to be torn down.
+        self._cycle_generation = new_generation
+        with self._payload_cache_lock:
+            self._payload_bytes_cache = None
+        with self._inflight_lock:
+            self._inflight.clear()
+        print(f"PrimaryNode: create_lock_cycle_onions: created {len(node_configs)} distributed nodes, primary_node_url={self.proxy_chain_config['primary_node_url']}")
+
+        # New generation is published and the config swapped; now retire the old one.
+        self._stop_nodes_parallel(old_nodes, "old distributed")
+
         # Retrieve the payload via the primary onion so we always have the latest encrypted bundle.
         self._retrieve_payload_via_onion()
         endpoint = f"http://{self.onion_address}/payload" if self.onion_address else f"http://{self.host}:{self.port}/payload"
         self._run_payload_pipeline(endpoint)
-        return created_node_info
+        # Overlap the next generation's bring-up with this cycle's lifetime.
+        self._start_pregeneration(count)
+        return node_configs
 
     # -------------------------- Other existing logic --------------------------
     def generate_proxy_chain_config(self) -> dict:
@@ -520,15 +660,64 @@ class PrimaryNode:
         print(f"PrimaryNode: Generated default proxy chain config: {config}")
         return config
 
-    def get_lock_cycle_payload(self, client_pub_key_pem: bytes) -> bytes:
-        """Generates and encrypts the lock-cycle payload (AES + wrap AES key with client PGP)."""
-        client_pub_key, _ = pgpy.PGPKey.from_blob(client_pub_key_pem)
+    def _build_lock_cycle_payload(self, client_pub_key_pem: bytes) -> Tuple[bytes, bytes]:
+        """Encrypts the lock-cycle payload, deduplicating concurrent requests.
 
-        payload = {
-            "proxy_chain_config": self.proxy_chain_config,
-            "primary_node_url": self.proxy_chain_config.get("primary_node_url", f"{self.host}:{self.port}")
-        }
-        payload_bytes = json.dumps(payload).encode("utf-8")
+        A burst of concurrent requests with the same client key does the
+        AES-encrypt + PGP-wrap chain once: the first caller computes, the
+        rest wait on its event and reuse the result. The entry is evicted
+        as soon as the build resolves, so a cached ciphertext never
+        outlives the flight that produced it; rotation clears whatever is
+        still in flight at swap time.
+        """
+        key = (self._cycle_generation, hashlib.sha256(bytes(client_pub_key_pem)).digest())
+        with self._inflight_lock:
+            entry = self._inflight.get(key)
+            if entry is None:
+                entry = (threading.Event(), [])
+                self._inflight[key] = entry
+                is_leader = True
+            else:
+                is_leader = False
+        event, slot = entry
+
+        if not is_leader:
+            event.wait(30)
+            if slot:
+                return slot[0]
+            # Leader failed or timed out; fall back to computing directly.
+            return self._encrypt_lock_cycle_payload(client_pub_key_pem)
+
+        try:
+            result = self._encrypt_lock_cycle_payload(client_pub_key_pem)
+            slot.append(result)
+            return result
+        finally:
+            event.set()
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+
+    def _encrypt_lock_cycle_payload(self, client_pub_key_pem: bytes) -> Tuple[bytes, bytes]:
+        """Encrypts the lock-cycle payload (AES + wrap AES key with client PGP).
+
+        Returns (aes_ciphertext, pgp_wrapped_aes_key) as raw bytes.
+        """
+        client_pub_key = _parse_client_key(bytes(client_pub_key_pem))
+
+        # The payload body is the same for every client within a cycle, so
+        # it is serialized once per generation; only the AES key and the
+        # client-specific PGP wrap below are per-request.
+        with self._payload_cache_lock:
+            cached = self._payload_bytes_cache
+            if cached is not None and cached[0] == self._cycle_generation:
+                payload_bytes = cached[1]
+            else:
+                payload = {
+                    "proxy_chain_config": self.proxy_chain_config,
+                    "primary_node_url": self.proxy_chain_config.get("primary_node_url", f"{self.host}:{self.port}")
+                }
+                payload_bytes = wire.json_dumps(payload)
+                self._payload_bytes_cache = (self._cycle_generation, payload_bytes)
 
         # AES encryption for payload
         aes_key = generate_aes_key()
@@ -536,11 +725,28 @@ class PrimaryNode:
 
         # wrap AES key with client PGP
         encrypted_aes_key_pgp = encrypt_pgp(aes_key, client_pub_key)
+        return encrypted_payload_aes, encrypted_aes_key_pgp
 
-        return json.dumps({
+    def get_lock_cycle_payload(self, client_pub_key_pem: bytes) -> bytes:
+        """Lock-cycle payload as a binary envelope with raw ciphertext fields.
+
+        Ciphertext travels as msgpack bin fields instead of hex-in-JSON,
+        halving the wire size and skipping the per-byte hex passes.
+        """
+        encrypted_payload_aes, encrypted_aes_key_pgp = self._build_lock_cycle_payload(client_pub_key_pem)
+        return wire.pack({
+            "v": 2,
+            "encrypted_payload": encrypted_payload_aes,
+            "encrypted_aes_key": encrypted_aes_key_pgp,
+        })
+
+    def get_lock_cycle_payload_json(self, client_pub_key_pem: bytes) -> bytes:
+        """Hex/JSON payload envelope kept for the HTTP endpoint (curl, scripts)."""
+        encrypted_payload_aes, encrypted_aes_key_pgp = self._build_lock_cycle_payload(client_pub_key_pem)
+        return wire.json_dumps({
             "encrypted_payload": encrypted_payload_aes.hex(),
             "encrypted_aes_key": encrypted_aes_key_pgp.hex()
-        }).encode("utf-8")
+        })
 
     def refresh_lock_cycle(self):
         """Refresh lock-cycle: create 6 new distributed nodes and their onion services."""
@@ -557,9 +763,9 @@ class PrimaryNode:
         # First, create the initial set of distributed nodes
         self.create_lock_cycle_onions(count=6, publish_timeout=20.0)
 
-        while self.running:
-            # production: time.sleep(60)
-            time.sleep(60)
+        # wait() returns True only when the stop event fires, so shutdown
+        # interrupts the 60s interval instead of waiting it out.
+        while not self._stop_event.wait(60):
             try:
                 self.refresh_lock_cycle()
             except Exception as e:
@@ -660,7 +866,7 @@ class PrimaryNode:
                 return self._http_response(
                     200,
                     "OK",
-                    json.dumps(health).encode("utf-8"),
+                    wire.json_dumps(health),
                     content_type="application/json",
                 )
 
@@ -692,8 +898,8 @@ class PrimaryNode:
                         content_type="application/json",
                     )
                 try:
-                    payload_request = json.loads(body.decode("utf-8"))
-                except (json.JSONDecodeError, UnicodeDecodeError):
+                    payload_request = wire.json_loads(body)
+                except ValueError:
                     return self._http_response(
                         400,
                         "Bad Request",
@@ -703,7 +909,7 @@ class PrimaryNode:
 
                 if payload_request.get("type") == "get_payload" and "pub_key" in payload_request:
                     client_pub_key_pem = payload_request["pub_key"].encode("utf-8")
-                    response = self.get_lock_cycle_payload(client_pub_key_pem)
+                    response = self.get_lock_cycle_payload_json(client_pub_key_pem)
                     return self._http_response(
                         200,
                         "OK",
@@ -725,8 +931,8 @@ class PrimaryNode:
             )
 
         try:
-            request = json.loads(data.decode("utf-8"))
-        except (json.JSONDecodeError, UnicodeDecodeError):
+            request = wire.json_loads(data)
+        except ValueError:
             return b"PrimaryNode: Error: Invalid JSON request"
 
         if request.get("type") == "get_payload":
@@ -739,7 +945,7 @@ class PrimaryNode:
             # However, for backward compatibility or direct processing by PrimaryNode, we can keep it.
             print("PrimaryNode: Received 'process_data' request. This should now go to distributed nodes.")
             # For now, we'll just return an error or a placeholder response.
-            return json.dumps({"status": "error", "message": "Please use distributed nodes for data processing."}).encode("utf-8")
+            return wire.json_dumps({"status": "error", "message": "Please use distributed nodes for data processing."})
         return b"PrimaryNode: Error: Unknown request type"
 
     def start_server(self):
@@ -759,6 +965,7 @@ class PrimaryNode:
                 onion_addr, service_id = result
                 self.onion_address = onion_addr  # Store PrimaryNode's own onion address
                 self._persist_onion_address(onion_addr)
+        self.onion_ready.set()
 
         self.lock_cycle_thread = threading.Thread(target=self._lock_cycle_worker, daemon=True)
         self.lock_cycle_thread.start()
@@ -767,14 +974,15 @@ class PrimaryNode:
     def stop_server(self):
         """Stop server and cleanup ephemeral services."""
         self.running = False
-        # Stop all distributed nodes
-        if self.distributed_nodes:
-            for node_id, node_instance in list(self.distributed_nodes.items()):
-                try:
-                    node_instance.stop_server()
-                except Exception as e:
-                    print(f"PrimaryNode: Warning stopping distributed node {node_id} at shutdown: {e}")
-            self.distributed_nodes = {}
+        self._stop_event.set()
+        # Stop all distributed nodes, plus any pregenerated (not yet
+        # adopted) ones, concurrently
+        with self._pregen_lock:
+            pregenerated, self._pregenerated_nodes = self._pregenerated_nodes, {}
+        to_stop = dict(self.distributed_nodes)
+        to_stop.update(pregenerated)
+        self.distributed_nodes = {}
+        self._stop_nodes_parallel(to_stop, "distributed")
 
         # Remove PrimaryNode's own ephemeral service
         if self.tor_controller and self.hidden_services:
@@ -0,0 +1,92 @@
+"""Tests for SocksConnectionPool request handling and stale-socket retry.
+
+No Tor: connections are stub sockets, and prewarm is disabled so no
+background threads dial out during the tests.
+"""
+
+import pytest
+
+from src.network import wire
+from src.network.connection_pool import SocksConnectionPool
+
+
+class StubConn:
+    """Minimal socket stand-in: framed response on success, error when dead."""
+
+    def __init__(self, response: bytes = b"", dead: bool = False):
+        self.dead = dead
+        self.closed = False
+        self.sent = b""
+        self._buf = wire.frame(response)
+
+    def sendall(self, data: bytes) -> None:
+        if self.dead:
+            raise ConnectionResetError("circuit died while parked")
+        self.sent += data
+
+    def recv_into(self, view, count: int) -> int:
+        if self.dead:
+            raise ConnectionResetError("circuit died while parked")
+        chunk = self._buf[:count]
+        view[: len(chunk)] = chunk
+        self._buf = self._buf[len(chunk):]
+        return len(chunk)
+
+    def close(self) -> None:
+        self.closed = True
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    pool = SocksConnectionPool(optimistic=False)
+    # No background dialing during tests.
+    monkeypatch.setattr(pool, "prewarm", lambda *args, **kwargs: None)
+    return pool
+
+
+def test_request_uses_pooled_connection(pool):
+    conn = StubConn(response=b"pong")
+    pool._pool_for("dest.onion").put_nowait(conn)
+
+    assert pool.request("dest.onion", b"ping") == b"pong"
+    assert conn.sent == wire.frame(b"ping")
+    # Healthy connection goes back to the pool for the next message.
+    assert pool._pool_for("dest.onion").get_nowait() is conn
+
+
+def test_stale_pooled_connection_retries_on_fresh(pool, monkeypatch):
+    stale = StubConn(dead=True)
+    fresh = StubConn(response=b"pong")
+    pool._pool_for("dest.onion").put_nowait(stale)
+    monkeypatch.setattr(pool, "_open_connection", lambda addr, port=80: fresh)
+
+    assert pool.request("dest.onion", b"ping") == b"pong"
+    assert stale.closed
+    assert fresh.sent == wire.frame(b"ping")
+
+
+def test_fresh_connection_failure_propagates(pool, monkeypatch):
+    stale = StubConn(dead=True)
+    also_dead = StubConn(dead=True)
+    pool._pool_for("dest.onion").put_nowait(stale)
+    monkeypatch.setattr(pool, "_open_connection", lambda addr, port=80: also_dead)
+
+    with pytest.raises(ConnectionResetError):
+        pool.request("dest.onion", b"ping")
+    assert stale.closed
+    assert also_dead.closed
+
+
+def test_stale_retry_uses_optimistic_path(pool, monkeypatch):
+    pool.optimistic = True
+    stale = StubConn(dead=True)
+    fresh = StubConn()
+    pool._pool_for("dest.onion").put_nowait(stale)
+    monkeypatch.setattr(
+        pool, "_optimistic_request", lambda addr, payload, port=80: (fresh, b"pong")
+    )
+
+    assert pool.request("dest.onion", b"ping") == b"pong"
+    assert stale.closed
+    # The fresh optimistic connection is parked for reuse.
+    assert pool._pool_for("dest.onion").get_nowait() is fresh
@@ -0,0 +1,116 @@
+"""Tests for the wire module: envelopes, framing, and templates.
+
+No Tor or network access needed: framing runs over a local socketpair and
+everything else is pure byte transformation.
+"""
+
+import socket
+
+import pytest
+
+from src.network import wire
+
+
+ENVELOPE = {
+    "status": "final_processed",
+    "data": b"\x00\x01\xff" * 7,
+    "hops": [b"inner", "outer", 3],
+    "meta": {"nested": b"\xde\xad\xbe\xef", "flag": True, "empty": b""},
+}
+
+
+# ------------------------------------------------------------- Envelopes --
+def test_pack_unpack_round_trip():
+    assert wire.unpack(wire.pack(ENVELOPE)) == ENVELOPE
+
+
+def test_json_fallback_round_trip(monkeypatch):
+    monkeypatch.setattr(wire, "msgpack", None)
+    packed = wire.pack(ENVELOPE)
+    assert packed[0] == wire.TAG_JSON
+    assert wire.unpack(packed) == ENVELOPE
+
+
+@pytest.mark.skipif(wire.msgpack is None, reason="msgpack not installed")
+def test_json_envelope_readable_by_msgpack_peer(monkeypatch):
+    # A peer without msgpack sends TAG_JSON; an upgraded peer must still
+    # decode it (and vice versa the tag keeps formats unambiguous).
+    monkeypatch.setattr(wire, "msgpack", None)
+    packed = wire.pack(ENVELOPE)
+    monkeypatch.undo()
+    assert packed[0] == wire.TAG_JSON
+    assert wire.unpack(packed) == ENVELOPE
+
+
+def test_unpack_rejects_garbage():
+    with pytest.raises(ValueError):
+        wire.unpack(b"")
+    with pytest.raises(ValueError):
+        wire.unpack(b"\x7fnot-a-tag")
+
+
+def test_json_dumps_loads_round_trip():
+    obj = {"a": 1, "b": [True, None, "x"], "c": {"d": 2.5}}
+    data = wire.json_dumps(obj)
+    assert isinstance(data, bytes)
+    assert wire.json_loads(data) == obj
+    assert wire.json_loads(data.decode("utf-8")) == obj
+
+
+# --------------------------------------------------------------- Framing --
+def _framed_pair(payload: bytes) -> bytes:
+    left, right = socket.socketpair()
+    try:
+        left.sendall(wire.frame(payload))
+        return wire.read_frame(right)
+    finally:
+        left.close()
+        right.close()
+
+
+def test_frame_round_trip():
+    for payload in (b"", b"hello", b"\x00" * 70000):
+        assert _framed_pair(payload) == payload
+
+
+def test_read_frame_rejects_oversized_header():
+    left, right = socket.socketpair()
+    try:
+        left.sendall(wire.FRAME_HEADER.pack(wire.MAX_FRAME_SIZE + 1))
+        with pytest.raises(ValueError):
+            wire.read_frame(right)
+    finally:
+        left.close()
+        right.close()
+
+
+def test_read_frame_detects_truncation():
+    left, right = socket.socketpair()
+    try:
+        left.sendall(wire.frame(b"full payload")[:-3])
+        left.close()
+        with pytest.raises(ConnectionError):
+            wire.read_frame(right)
+    finally:
+        right.close()
+
+
+# ------------------------------------------------------------- Templates --
+@pytest.mark.parametrize("size", [0, 17, 300, 70000])
+def test_envelope_template_matches_pack(size):
+    # build() output must be unpack()-compatible across all bin-header widths.
+    data = bytes(range(256)) * (size // 256) + bytes(range(size % 256))
+    template = wire.EnvelopeTemplate({"status": "final_processed"}, bin_field="data")
+    assert wire.unpack(template.build(data)) == {"status": "final_processed", "data": data}
+
+
+def test_envelope_template_json_fallback(monkeypatch):
+    monkeypatch.setattr(wire, "msgpack", None)
+    template = wire.EnvelopeTemplate({"kind": "fwd"}, bin_field="encrypted_data")
+    payload = b"ciphertext \x00\xff bytes"
+    assert wire.unpack(template.build(payload)) == {"kind": "fwd", "encrypted_data": payload}
+
+
+def test_envelope_template_no_fixed_fields():
+    template = wire.EnvelopeTemplate({}, bin_field="encrypted_data")
+    assert wire.unpack(template.build(b"blob")) == {"encrypted_data": b"blob"}
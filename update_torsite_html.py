@@ -20,11 +20,18 @@ Given an .onion address and an input HTML file, the script locates the matching
 from __future__ import annotations
 
 import argparse
+import json
 import os
 from pathlib import Path
+import hashlib
 import shutil
 import sys
-from typing import Optional, Tuple
+import tempfile
+from typing import Dict, Optional, Tuple
+
+# Cached {hostname: tor_data dir} index, kept alongside the torsite root so
+# repeated updates cost one lookup instead of re-reading every hostname file.
+INDEX_FILENAME = ".hostname_index.json"
 
 
 def parse_args() -> argparse.Namespace:
@@ -69,31 +76,93 @@ def normalise_onion_address(onion: str) -> str:
     return onion if onion.endswith(".onion") else f"{onion}.onion"
 
 
-def find_hidden_service_dirs(root: Path, onion_address: str) -> Optional[Tuple[Path, Path]]:
-    if not root.is_dir():
-        raise FileNotFoundError(f"Torsite root not found: {root}")
+def _build_hostname_index(root: Path) -> Dict[str, Dict[str, object]]:
+    """Scans every tor_data_* directory once, mapping hostname -> entry.
 
-    for tor_dir in sorted(root.glob("tor_data_*")):
-        hostname_path = tor_dir / "hostname"
-        if not hostname_path.is_file():
-            continue
+    Uses os.scandir so directory-type checks come from the cached DirEntry
+    info instead of one stat(2) per candidate.
+    """
+    index: Dict[str, Dict[str, object]] = {}
+    with os.scandir(root) as entries:
+        tor_dirs = sorted(
+            (entry for entry in entries
+             if entry.name.startswith("tor_data_") and entry.is_dir(follow_symlinks=False)),
+            key=lambda entry: entry.name,
+        )
 
+    for dir_entry in tor_dirs:
+        hostname_path = os.path.join(dir_entry.path, "hostname")
         try:
-            hostname = hostname_path.read_text(encoding="utf-8").strip().lower()
+            mtime_ns = os.stat(hostname_path).st_mtime_ns
+            with open(hostname_path, encoding="utf-8") as handle:
+                hostname = handle.read().strip().lower()
+        except (FileNotFoundError, IsADirectoryError, NotADirectoryError):
+            continue
         except OSError as exc:
             raise RuntimeError(f"Failed to read hostname from {hostname_path}: {exc}") from exc
 
-        if hostname == onion_address:
-            # Try to align with create_torsite's naming (html_nodeX)
-            suffix = tor_dir.name.replace("tor_data_", "", 1)
-            html_dir = root / f"html_{suffix}"
-            if not html_dir.is_dir():
-                raise FileNotFoundError(
-                    f"Matched {onion_address} but HTML directory missing: {html_dir}"
-                )
-            return tor_dir, html_dir
+        index[hostname] = {"tor_dir": dir_entry.path, "mtime_ns": mtime_ns}
+    return index
+
+
+def _load_hostname_index(root: Path) -> Dict[str, Dict[str, object]]:
+    try:
+        return json.loads((root / INDEX_FILENAME).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_hostname_index(root: Path, index: Dict[str, Dict[str, object]]) -> None:
+    try:
+        (root / INDEX_FILENAME).write_text(json.dumps(index), encoding="utf-8")
+    except OSError:
+        # The index is purely an accelerator; failing to persist it is fine.
+        pass
+
 
-    return None
+def _index_entry_current(entry: Dict[str, object]) -> bool:
+    """True when the cached entry still matches the hostname file on disk."""
+    try:
+        hostname_path = Path(str(entry["tor_dir"])) / "hostname"
+        return hostname_path.stat().st_mtime_ns == entry["mtime_ns"]
+    except (OSError, KeyError):
+        return False
+
+
+def find_hidden_service_dirs(root: Path, onion_address: str) -> Optional[Tuple[Path, Path]]:
+    if not root.is_dir():
+        raise FileNotFoundError(f"Torsite root not found: {root}")
+
+    # O(1) hit on the cached index; fall back to a full rescan when the
+    # address is unknown or the cached hostname file has changed.
+    index = _load_hostname_index(root)
+    entry = index.get(onion_address)
+    if entry is None or not _index_entry_current(entry):
+        index = _build_hostname_index(root)
+        _save_hostname_index(root, index)
+        entry = index.get(onion_address)
+
+    if entry is None:
+        return None
+
+    tor_dir = Path(str(entry["tor_dir"]))
+    # Try to align with create_torsite's naming (html_nodeX)
+    suffix = tor_dir.name.replace("tor_data_", "", 1)
+    html_dir = root / f"html_{suffix}"
+    if not html_dir.is_dir():
+        raise FileNotFoundError(
+            f"Matched {onion_address} but HTML directory missing: {html_dir}"
+        )
+    return tor_dir, html_dir
+
+
+def _digest(path: Path) -> bytes:
+    """Streaming blake2b digest used to detect already-identical files."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.digest()
 
 
 def backup_existing(html_path: Path) -> None:
@@ -130,15 +199,38 @@ def update_hidden_service_html(
     _, html_dir = match
     destination = html_dir / output_name
 
+    # No-op updates (CI loops, repeated deploys) are common; skip the write
+    # when the destination already carries identical content.
+    try:
+        if destination.is_file() and _digest(destination) == _digest(html_source):
+            print(f"[=] {destination} already up to date; skipping copy")
+            return destination
+    except OSError:
+        pass
+
     if backup:
         backup_existing(destination)
 
+    # Copy into a sibling tempfile and os.replace it over the destination:
+    # the rename is atomic, so a concurrent hidden-service request never
+    # sees a half-written file, and a failed copy leaves no partial state.
+    tmp_path = None
     try:
-        shutil.copyfile(html_source, destination)
+        with open(html_source, "rb") as src_handle, tempfile.NamedTemporaryFile(
+            dir=html_dir, delete=False
+        ) as tmp_handle:
+            tmp_path = tmp_handle.name
+            shutil.copyfileobj(src_handle, tmp_handle, length=1 << 20)
+            os.fchmod(tmp_handle.fileno(), 0o644)
+        os.replace(tmp_path, destination)
     except OSError as exc:
+        if tmp_path is not None:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
         raise RuntimeError(f"Failed to copy {html_source} to {destination}: {exc}") from exc
 
-    os.chmod(destination, 0o644)
     return destination
 
 